@@ -5,12 +5,16 @@ Clean UI + high-quality translation + word-level language analysis
 ✅ No examples
 """
 
+import threading
 import gradio as gr
 from model_handler import TranslationModel
-from language_config import get_language_code, get_all_language_names, get_language_name_from_code
+from language_config import ALL_LANGUAGE_NAMES, CODE_TO_LANGUAGE, get_language_code
 
 translator = TranslationModel()
-translator.load_model()
+# ✅ load in the background: the UI starts immediately, first request waits if needed
+threading.Thread(target=translator.load_model, daemon=True).start()
+
+CONCURRENCY_LIMIT = 4  # parallel translate requests
 
 SIMPLE_CSS = """
 * {font-family: 'Inter', -apple-system, BlinkMacSystemFont, sans-serif;}
@@ -63,7 +67,8 @@ def format_analysis(analysis):
     if not analysis:
         return ""
 
-    langs = [get_language_name_from_code(code) for code in analysis["languages_detected"]]
+    name_of = CODE_TO_LANGUAGE.get
+    langs = [name_of(code, code) for code in analysis["languages_detected"]]
     md = f"✅ **Detected Languages ({analysis['languages_count']}):** " + ", ".join(langs) + "\n\n"
 
     md += "✅ **Word-by-word:**\n"
@@ -71,7 +76,7 @@ def format_analysis(analysis):
         if lang == "punct":
             md += f"- `{word}` → punctuation\n"
         else:
-            md += f"- **{word}** → `{get_language_name_from_code(lang)}`\n"
+            md += f"- **{word}** → `{name_of(lang, lang)}`\n"
 
     return md
 
@@ -109,7 +114,7 @@ def create_app():
             with gr.Row():
                 gr.Markdown("**Target Language:**")
                 target_lang = gr.Dropdown(
-                    choices=get_all_language_names(),
+                    choices=ALL_LANGUAGE_NAMES,
                     value="Arabic",
                     show_label=False
                 )
@@ -130,17 +135,21 @@ def create_app():
             translate_btn.click(
                 fn=translate_ui,
                 inputs=[source_text, target_lang],
-                outputs=[translation_output, status, analysis_box]
+                outputs=[translation_output, status, analysis_box],
+                concurrency_limit=CONCURRENCY_LIMIT,
+                concurrency_id="translate"  # click + submit share one limit
             )
 
             source_text.submit(
                 fn=translate_ui,
                 inputs=[source_text, target_lang],
-                outputs=[translation_output, status, analysis_box]
+                outputs=[translation_output, status, analysis_box],
+                concurrency_limit=CONCURRENCY_LIMIT,
+                concurrency_id="translate"
             )
 
     try:
-        app.queue(max_size=20)
+        app.queue(max_size=20, default_concurrency_limit=CONCURRENCY_LIMIT)
     except TypeError:
         app.queue()
 
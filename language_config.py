@@ -61,6 +61,7 @@ LANGUAGES = {
 }
 
 CODE_TO_LANGUAGE = {code: name for name, code in LANGUAGES.items()}
+ALL_LANGUAGE_NAMES = tuple(sorted(LANGUAGES.keys()))
 
 
 def get_language_code(language_name: str):
@@ -72,4 +73,4 @@ def get_language_name_from_code(code: str):
 
 
 def get_all_language_names():
-    return sorted(LANGUAGES.keys())
+    return ALL_LANGUAGE_NAMES
@@ -19,6 +19,16 @@ except ImportError:
     LANGDETECT_AVAILABLE = False
 
 
+# words (group 1) or punctuation runs; whitespace never becomes a token
+_TOKEN_RE = re.compile(r"(\w+)|[^\w\s]+")
+
+
+def _iter_tokens(text: str):
+    """Yields (token, is_word) for word and punctuation runs."""
+    for m in _TOKEN_RE.finditer(text):
+        yield m.group(), m.lastindex == 1
+
+
 class LanguageDetector:
     MAP = {
         "ar": "arb_Arab",
@@ -37,17 +47,18 @@ class LanguageDetector:
         "vi": "vie_Latn",
     }
 
-    SCRIPT_PATTERNS = {
-        "arabic": re.compile(r"[\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF]+"),
-        "cyrillic": re.compile(r"[\u0400-\u04FF]+"),
-        "greek": re.compile(r"[\u0370-\u03FF]+"),
-        "hebrew": re.compile(r"[\u0590-\u05FF]+"),
-        "thai": re.compile(r"[\u0E00-\u0E7F]+"),
-        "devanagari": re.compile(r"[\u0900-\u097F]+"),
-        "korean": re.compile(r"[\uAC00-\uD7AF]+"),
-        "japanese": re.compile(r"[\u3040-\u30FF]+"),
-        "chinese": re.compile(r"[\u4E00-\u9FFF]+"),
-    }
+    # one alternation; each match is a same-script run named by its group
+    SCRIPT_RE = re.compile(
+        r"(?P<arabic>[\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF]+)"
+        r"|(?P<cyrillic>[\u0400-\u04FF]+)"
+        r"|(?P<greek>[\u0370-\u03FF]+)"
+        r"|(?P<hebrew>[\u0590-\u05FF]+)"
+        r"|(?P<thai>[\u0E00-\u0E7F]+)"
+        r"|(?P<devanagari>[\u0900-\u097F]+)"
+        r"|(?P<korean>[\uAC00-\uD7AF]+)"
+        r"|(?P<japanese>[\u3040-\u30FF]+)"
+        r"|(?P<chinese>[\u4E00-\u9FFF]+)"
+    )
 
     SCRIPT_DEFAULT = {
         "arabic": "arb_Arab",
@@ -61,57 +72,71 @@ class LanguageDetector:
         "chinese": "zho_Hans",
     }
 
+    # first listed script wins (kana before Han: kanji-first Japanese stays Japanese)
+    SCRIPT_PRIORITY = {script: i for i, script in enumerate(SCRIPT_DEFAULT)}
+
     def detect_by_script(self, token: str):
-        for script, pat in self.SCRIPT_PATTERNS.items():
-            if pat.search(token):
-                return self.SCRIPT_DEFAULT[script]
-        return None
-
-    def detect_language(self, token: str, fallback="eng_Latn") -> str:
-        token = token.strip()
-        if not token:
+        script = min(
+            (m.lastgroup for m in self.SCRIPT_RE.finditer(token)),
+            key=self.SCRIPT_PRIORITY.__getitem__,
+            default=None,
+        )
+        return self.SCRIPT_DEFAULT[script] if script else None
+
+    def detect_run(self, tokens, fallback="eng_Latn") -> str:
+        """
+        Detect ONE language for a run of consecutive latin tokens.
+        langdetect sees the whole run (function words like "le", "de",
+        "the" are strong signals in a phrase), but is skipped when the run
+        has only short tokens, which it guesses badly.
+        """
+        if not LANGDETECT_AVAILABLE or all(len(t) <= 3 for t in tokens):
             return fallback
 
-        # script first
-        script_lang = self.detect_by_script(token)
-        if script_lang:
-            return script_lang
-
-        # short latin words are unstable
-        if re.fullmatch(r"[A-Za-z]+", token) and len(token) <= 3:
+        try:
+            code = detect(" ".join(tokens))
+            return self.MAP.get(code, fallback)
+        except:
             return fallback
 
-        # use langdetect for longer latin tokens
-        if LANGDETECT_AVAILABLE and len(token) >= 4:
-            try:
-                code = detect(token)
-                return self.MAP.get(code, fallback)
-            except:
-                return fallback
-
-        return fallback
-
     def analyze_words(self, text: str):
         if not text or not text.strip():
             return {"words": [], "languages_detected": [], "languages_count": 0}
 
-        tokens = re.findall(r"\w+|[^\w\s]+|\s+", text, flags=re.UNICODE)
-
         words = []
         context_lang = "eng_Latn"
+        run = []  # indexes in `words` of consecutive unresolved latin tokens
+
+        def flush():
+            nonlocal context_lang
+            if not run:
+                return
+            lang = self.detect_run([words[i][0] for i in run], fallback=context_lang)
+            for i in run:
+                words[i] = (words[i][0], lang)
+            context_lang = lang
+            run.clear()
 
-        for tok in tokens:
-            if tok.isspace():
-                continue
-
+        for tok, is_word in _iter_tokens(text):
             # punctuation
-            if re.fullmatch(r"[^\w\s]+", tok):
+            if not is_word:
+                flush()
                 words.append((tok, "punct"))
                 continue
 
-            lang = self.detect_language(tok, fallback=context_lang)
-            words.append((tok, lang))
-            context_lang = lang
+            # script first
+            script_lang = self.detect_by_script(tok)
+            if script_lang:
+                flush()
+                words.append((tok, script_lang))
+                context_lang = script_lang
+                continue
+
+            # latin: resolved later, per run
+            run.append(len(words))
+            words.append((tok, None))
+
+        flush()
 
         langs = [lang for _, lang in words if lang != "punct"]
         counts = Counter(langs)
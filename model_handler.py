@@ -8,21 +8,44 @@ model_handler.py
 ✅ No placeholders
 """
 
+import queue
 import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import Future
+import numpy as np
 import torch
 from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
 from language_detector import LanguageDetector
+from language_config import LANGUAGES
+
+SUPPORTED_SRC = frozenset(LANGUAGES.values())
+SCRIPT_LANGS = frozenset(LanguageDetector.SCRIPT_DEFAULT.values())  # detected by script, not langdetect
+MAX_CANDIDATES = 3
+CACHE_SIZE = 256          # cached (text, src, tgt) translations
+CACHE_MAX_CHARS = 2000    # longer inputs bypass the cache
+MAX_BATCH = 8             # sequences per shared generate() call
+BATCH_WAIT_MS = 20        # how long the batcher waits for company
+PAD_RATIO = 1.3           # max longest/shortest input length inside one batch
+
+
+_WS_RE = re.compile(r"\s+")
+_LATIN_CHAR_RE = re.compile(r"[A-Za-z]")
 
 
 def normalize(text: str) -> str:
-    return re.sub(r"\s+", " ", text).strip() if text else ""
+    return _WS_RE.sub(" ", text).strip() if text else ""
 
 
 # --- script detection helpers ---
-ARABIC_RE = re.compile(r"[\u0600-\u06FF]")
-LATIN_RE = re.compile(r"[A-Za-z]")
-CYRILLIC_RE = re.compile(r"[\u0400-\u04FF]")
-CJK_RE = re.compile(r"[\u4E00-\u9FFF]")
+# codepoint (BMP) -> script class: 0 other, 1 Arabic, 2 Latin, 3 Cyrillic, 4 CJK
+_SCRIPT_CLASS = np.zeros(0x10000, dtype=np.uint8)
+_SCRIPT_CLASS[0x0600:0x0700] = 1
+_SCRIPT_CLASS[ord("A"):ord("Z") + 1] = 2
+_SCRIPT_CLASS[ord("a"):ord("z") + 1] = 2
+_SCRIPT_CLASS[0x0400:0x0500] = 3
+_SCRIPT_CLASS[0x4E00:0xA000] = 4
 
 
 def count_leftover_scripts(text: str, target_lang_code: str) -> int:
@@ -35,10 +58,10 @@ def count_leftover_scripts(text: str, target_lang_code: str) -> int:
     if not text:
         return 999
 
-    arabic = len(ARABIC_RE.findall(text))
-    latin = len(LATIN_RE.findall(text))
-    cyr = len(CYRILLIC_RE.findall(text))
-    cjk = len(CJK_RE.findall(text))
+    # one vectorized pass over the codepoints
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+    codes = np.where(codes > 0xFFFF, 0, codes)
+    _, arabic, latin, cyr, cjk = np.bincount(_SCRIPT_CLASS[codes], minlength=5).tolist()
 
     # Target script expectation
     if target_lang_code in ["arb_Arab", "pes_Arab", "urd_Arab"]:
@@ -61,19 +84,19 @@ def count_leftover_scripts(text: str, target_lang_code: str) -> int:
     return latin + arabic
 
 
-def score_translation(source: str, translation: str, target_lang_code: str) -> float:
+def score_translation(source_norm: str, translation: str, target_lang_code: str) -> float:
     """
     Higher score = better.
+    `source_norm` must already be normalized (translate() does it once).
     ✅ reward completeness
     ✅ penalize leftover foreign scripts
     """
     if not translation:
         return -999
 
-    source = normalize(source)
     translation = normalize(translation)
 
-    ratio = len(translation) / max(len(source), 1)
+    ratio = len(translation) / max(len(source_norm), 1)
     end_bonus = 0.25 if translation[-1] in ".!?؟" else 0.0
 
     leftover = count_leftover_scripts(translation, target_lang_code)
@@ -85,57 +108,251 @@ def score_translation(source: str, translation: str, target_lang_code: str) -> f
     return (ratio + end_bonus) - (leftover_penalty + short_penalty)
 
 
+def length_groups(seqs, max_ratio=PAD_RATIO):
+    """
+    Sort sequences by length and split them into groups whose longest
+    member is at most `max_ratio` x the shortest, so padding stays small.
+    Returns lists of indexes into `seqs`.
+    """
+    groups = []
+    for i in sorted(range(len(seqs)), key=lambda i: len(seqs[i])):
+        if groups and len(seqs[i]) <= len(seqs[groups[-1][0]]) * max_ratio:
+            groups[-1].append(i)
+        else:
+            groups.append([i])
+    return groups
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent generate requests into shared batches.
+    Callers block in submit(); one background thread waits up to
+    `wait_ms` to gather up to `max_batch` items, runs them grouped by
+    target language (one forced BOS per generate), and hands results back.
+    """
+
+    def __init__(self, run_batch, max_batch=MAX_BATCH, wait_ms=BATCH_WAIT_MS):
+        self.run_batch = run_batch  # (texts, src_langs, tgt_lang) -> [translation]
+        self.max_batch = max_batch
+        self.wait = wait_ms / 1000
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, texts, src_langs, tgt_lang: str):
+        futures = []
+        with self._start_lock:  # enqueue + (re)start atomically vs. a dying worker
+            for text, src_lang in zip(texts, src_langs):
+                fut = Future()
+                self._queue.put((text, src_lang, tgt_lang, fut))
+                futures.append(fut)
+            self._ensure_started()
+
+        return [fut.result() for fut in futures]
+
+    def _ensure_started(self):
+        # caller holds _start_lock
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        batch = []
+        try:
+            while True:
+                batch = [self._queue.get()]
+                deadline = time.monotonic() + self.wait
+
+                while len(batch) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(self._queue.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+
+                groups = {}
+                for item in batch:
+                    groups.setdefault(item[2], []).append(item)
+
+                for tgt_lang, items in groups.items():
+                    self._run(items, tgt_lang)
+        except BaseException as e:
+            # never leave a caller waiting on a worker that is gone
+            for item in batch:
+                if not item[3].done():
+                    item[3].set_exception(RuntimeError(f"translation batcher stopped: {e!r}"))
+            with self._start_lock:
+                self._thread = None
+                if not self._queue.empty():
+                    self._ensure_started()
+            raise
+
+    def _run(self, items, tgt_lang: str):
+        try:
+            outs = self.run_batch([i[0] for i in items], [i[1] for i in items], tgt_lang)
+            if len(outs) != len(items):
+                raise RuntimeError(f"expected {len(items)} translations, got {len(outs)}")
+        except Exception as e:
+            if len(items) == 1:
+                items[0][3].set_exception(e)
+                return
+            # shared batch failed (OOM, one bad input...): retry each caller alone
+            for item in items:
+                self._run([item], tgt_lang)
+            return
+
+        for item, out in zip(items, outs):
+            item[3].set_result(out)
+
+
 class TranslationModel:
-    def __init__(self, model_name="facebook/nllb-200-distilled-600M"):
+    def __init__(self, model_name="facebook/nllb-200-distilled-600M", num_beams=5, quantize=True):
         self.model_name = model_name
+        self.num_beams = num_beams
+        self.quantize = quantize  # int8 encoder/decoder Linear layers (CPU only)
         self.model = None
         self.tokenizer = None
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         self.detector = LanguageDetector()
+        self._cache = OrderedDict()  # (text, src, tgt) -> translation, LRU order
+        self._lock = threading.Lock()  # guards cache + tokenizer under concurrent requests
+        self._batcher = MicroBatcher(self._generate)  # shares generate() across requests
+        self._tgt_id_cache = {}  # lang code -> token id
+        self._load_lock = threading.Lock()
         print(f"🖥️ Device: {self.device.upper()}")
 
     def load_model(self):
+        """
+        Safe to call from several threads: the first caller loads, the
+        others block on the lock until the model is ready.
+        """
         if self.model is not None:
             return
 
-        print("📥 Loading translation model...")
-        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name, use_fast=True)
-
-        self.model = AutoModelForSeq2SeqLM.from_pretrained(
-            self.model_name,
-            torch_dtype=torch.float16 if self.device == "cuda" else torch.float32,
-        ).to(self.device)
-
-        self.model.eval()
-        print("✅ Model loaded successfully!")
-
-    def _translate_with_src(self, text: str, src_lang: str, tgt_lang: str) -> str:
-        self.tokenizer.src_lang = src_lang
-
-        inputs = self.tokenizer(
-            text,
+        with self._load_lock:
+            if self.model is not None:
+                return
+
+            print("📥 Loading translation model...")
+            self.tokenizer = AutoTokenizer.from_pretrained(self.model_name, use_fast=True)
+
+            if self.device == "cuda":
+                dtype = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+            else:
+                dtype = torch.float32
+
+            # ✅ low_cpu_mem_usage: build on empty weights, then load the checkpoint once
+            try:
+                # ✅ fused attention kernel (needs a recent transformers)
+                model = AutoModelForSeq2SeqLM.from_pretrained(
+                    self.model_name, torch_dtype=dtype, low_cpu_mem_usage=True, attn_implementation="sdpa"
+                )
+            except (TypeError, ValueError, ImportError):
+                model = AutoModelForSeq2SeqLM.from_pretrained(
+                    self.model_name, torch_dtype=dtype, low_cpu_mem_usage=True
+                )
+
+            if self.device == "cpu" and self.quantize:
+                # ✅ int8 Linear layers: matmuls dominate CPU inference.
+                # Only encoder/decoder: the tied 256k-vocab lm_head stays full precision.
+                for part in (model.get_encoder(), model.get_decoder()):
+                    torch.ao.quantization.quantize_dynamic(part, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+            model = model.to(self.device)
+            model.eval()
+
+            # publish last, so no request sees a half-initialized model
+            self.model = model
+            print("✅ Model loaded successfully!")
+
+    def _translate_batch(self, texts, src_langs, tgt_lang: str):
+        """
+        Translate several (text, src_lang) pairs, serving repeats from the
+        LRU cache and sending the misses to the micro-batcher.
+        """
+        results = [None] * len(texts)
+        misses = []
+
+        with self._lock:
+            for i, (text, src_lang) in enumerate(zip(texts, src_langs)):
+                key = (text, src_lang, tgt_lang)
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    results[i] = self._cache[key]
+                else:
+                    misses.append(i)
+
+        if misses:
+            outs = self._batcher.submit([texts[i] for i in misses], [src_langs[i] for i in misses], tgt_lang)
+            with self._lock:
+                for i, out in zip(misses, outs):
+                    results[i] = out
+                    if len(texts[i]) <= CACHE_MAX_CHARS:
+                        self._cache[(texts[i], src_langs[i], tgt_lang)] = out
+                        if len(self._cache) > CACHE_SIZE:
+                            self._cache.popitem(last=False)
+
+        return results
+
+    def _tgt_id(self, code: str) -> int:
+        tid = self._tgt_id_cache.get(code)
+        if tid is None:
+            tid = self._tgt_id_cache.setdefault(code, self.tokenizer.convert_tokens_to_ids(code))
+        return tid
+
+    def _generate(self, texts, src_langs, tgt_lang: str):
+        """
+        NLLB fast tokenizers hold a single src_lang, so each text is
+        tokenized on its own and the results are padded together.
+        Identical encodings (same text + src_lang, e.g. from concurrent
+        requests) are encoded and decoded only once, and sequences of
+        similar length are generated together (see length_groups).
+        """
+        unique = {}  # input_ids -> row in the batch
+        rows = []
+        with self._lock:  # tokenizer.src_lang is shared state
+            for text, src_lang in zip(texts, src_langs):
+                if self.tokenizer.src_lang != src_lang:  # setter rebuilds special tokens
+                    self.tokenizer.src_lang = src_lang
+                ids = tuple(self.tokenizer(text, truncation=True, max_length=512)["input_ids"])
+                rows.append(unique.setdefault(ids, len(unique)))
+
+        seqs = list(unique)
+        outs = [None] * len(seqs)
+        for group in length_groups(seqs):
+            for i, out in zip(group, self._generate_padded([seqs[i] for i in group], tgt_lang)):
+                outs[i] = out
+
+        return [outs[row] for row in rows]
+
+    def _generate_padded(self, seqs, tgt_lang: str):
+        inputs = self.tokenizer.pad(
+            {
+                "input_ids": [list(ids) for ids in seqs],
+                "attention_mask": [[1] * len(ids) for ids in seqs],
+            },
             return_tensors="pt",
-            truncation=True,
-            padding=True,
-            max_length=512
         )
         inputs = {k: v.to(self.device) for k, v in inputs.items()}
+        input_len = inputs["input_ids"].shape[1]
 
         with torch.inference_mode():
             tokens = self.model.generate(
                 **inputs,
-                forced_bos_token_id=self.tokenizer.convert_tokens_to_ids(tgt_lang),
-                max_new_tokens=450,          # ✅ allow full output
-                num_beams=12,                # ✅ higher quality
+                forced_bos_token_id=self._tgt_id(tgt_lang),
+                max_new_tokens=min(450, int(input_len * 1.5) + 16),  # ✅ room for full output, no runaway KV cache
+                num_beams=self.num_beams,    # ✅ 5 beams ≈ same quality, ~half the cost
                 do_sample=False,
                 use_cache=True,
                 no_repeat_ngram_size=3,
                 repetition_penalty=1.18,
-                length_penalty=1.05,
+                length_penalty=1.0,
                 early_stopping=True,
             )
 
-        return self.tokenizer.batch_decode(tokens, skip_special_tokens=True)[0].strip()
+        return [t.strip() for t in self.tokenizer.batch_decode(tokens, skip_special_tokens=True)]
 
     def translate(self, text: str, target_lang_code: str):
         text = normalize(text)
@@ -148,27 +365,36 @@ class TranslationModel:
         analysis = self.detector.analyze_words(text)
         detected = analysis["languages_detected"]
 
-        # ✅ Try 3 possible source languages (best coverage)
-        candidates = []
-
-        # Arabic candidate (if Arabic detected)
-        if "arb_Arab" in detected:
-            candidates.append("arb_Arab")
+        # ✅ Only try source languages whose script is actually in the input.
+        # Script-detected languages rank ahead of langdetect guesses, then by word count.
+        word_counts = Counter(lang for _, lang in analysis["words"] if lang != "punct")
+        ranked = sorted(
+            (lang for lang in detected if lang in SUPPORTED_SRC),
+            key=lambda lang: (lang not in SCRIPT_LANGS, -word_counts[lang]),
+        )
+        sources = ranked[:MAX_CANDIDATES]
+
+        # English is the safest latin source. Latin runs get ONE label, so
+        # French + English code-switching shows up as just fra_Latn, and
+        # latin words after Arabic can inherit arb_Arab: keep English as a fallback.
+        needs_english = any(lang.endswith("_Latn") and lang != "eng_Latn" for lang in detected) or any(
+            not lang.endswith("_Latn") and _LATIN_CHAR_RE.search(word)
+            for word, lang in analysis["words"]
+            if lang != "punct"
+        )
+        if needs_english and len(sources) < MAX_CANDIDATES and "eng_Latn" not in sources:
+            sources.append("eng_Latn")
 
-        # English candidate always
-        candidates.append("eng_Latn")
+        if not sources:
+            sources.append("eng_Latn")
 
-        # French/Spanish candidate if present
-        if "fra_Latn" in detected:
-            candidates.append("fra_Latn")
-        elif "spa_Latn" in detected:
-            candidates.append("spa_Latn")
+        # Translate with all candidates (one batched generate pass)
+        translations = self._translate_batch([text] * len(sources), sources, target_lang_code)
 
-        # Translate with all candidates
-        outputs = []
-        for src in list(dict.fromkeys(candidates)):  # unique keep order
-            out = self._translate_with_src(text, src, target_lang_code)
-            outputs.append((out, score_translation(text, out, target_lang_code), src))
+        outputs = [
+            (out, score_translation(text, out, target_lang_code), src)
+            for out, src in zip(translations, sources)
+        ]
 
         # Choose best
         best_translation, best_score, best_src = max(outputs, key=lambda x: x[1])
@@ -0,0 +1,24 @@
+import unittest
+
+from language_detector import LanguageDetector
+
+
+class DetectByScriptTest(unittest.TestCase):
+    def setUp(self):
+        self.detector = LanguageDetector()
+
+    def test_kanji_first_japanese_is_japanese(self):
+        for token in ["私は学生です", "日本語を話します", "東京へ行きます"]:
+            self.assertEqual(self.detector.detect_by_script(token), "jpn_Jpan")
+
+    def test_han_only_is_chinese(self):
+        self.assertEqual(self.detector.detect_by_script("中文"), "zho_Hans")
+
+    def test_single_scripts(self):
+        self.assertEqual(self.detector.detect_by_script("مرحبا"), "arb_Arab")
+        self.assertEqual(self.detector.detect_by_script("привет"), "rus_Cyrl")
+        self.assertIsNone(self.detector.detect_by_script("hello"))
+
+
+if __name__ == "__main__":
+    unittest.main()